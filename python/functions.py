@@ -1,13 +1,229 @@
 # functions.py
 import os
+import time
+import functools
 import httpx
+import ijson
+import orjson
 import asyncio
-from typing import Dict, Any, List
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Read credentials once at import rather than on every tool call
+_NEWS_API_KEY = os.getenv("NEWS_API_KEY")
+_APIFY_TOKEN = os.getenv("APIFY_TOKEN")
 
+# Shared HTTP client so repeat calls to the same host reuse pooled connections
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared httpx.AsyncClient, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0),
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Stop Apify polling and close the shared httpx.AsyncClient. Called on server shutdown."""
+    global _client
+    await _poll_scheduler.close()
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def async_ttl_cache(ttl_seconds: float, maxsize: int = 128) -> Callable:
+    """Cache an async tool handler's results per normalized args for `ttl_seconds`.
+    
+    Only successful results are cached; error dicts and raised exceptions are not. At most
+    `maxsize` entries are kept, evicting the least recently used, and a stale entry is dropped
+    as soon as a lookup finds it expired.
+    """
+    def decorator(fn: Callable) -> Callable:
+        cache: "OrderedDict[bytes, Tuple[float, Any]]" = OrderedDict()
+        
+        @functools.wraps(fn)
+        async def wrapper(args: Dict[str, Any]) -> Any:
+            key = orjson.dumps(args, option=orjson.OPT_SORT_KEYS, default=str)
+            hit = cache.get(key)
+            if hit is not None:
+                if hit[0] > time.monotonic():
+                    cache.move_to_end(key)
+                    return hit[1]
+                del cache[key]
+            
+            result = await fn(args)
+            if not (isinstance(result, dict) and "error" in result):
+                cache[key] = (time.monotonic() + ttl_seconds, result)
+                cache.move_to_end(key)
+                while len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return result
+        
+        return wrapper
+    return decorator
+
+
+# In-flight calls keyed by tool + args, so concurrent duplicates share one upstream request
+_inflight: Dict[Tuple[Any, ...], asyncio.Task] = {}
+
+
+def single_flight(key_fn: Callable[[Dict[str, Any]], Tuple[Any, ...]]) -> Callable:
+    """Coalesce concurrent calls with the same `key_fn(args)` into a single execution.
+    
+    The handler runs in its own task; every caller with the same key, including the first,
+    awaits that task through asyncio.shield. Cancelling one caller therefore never cancels
+    the shared work or the other callers waiting on it. `key_fn` returns a tuple of the
+    normalized fields, so free-form values can never collide the way a joined string could.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        async def wrapper(args: Dict[str, Any]) -> Any:
+            key = (fn.__name__, *key_fn(args))
+            task = _inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(fn(args))
+                _inflight[key] = task
+                task.add_done_callback(lambda t, key=key: _finish_inflight(key, t))
+            return await asyncio.shield(task)
+        
+        return wrapper
+    return decorator
+
+
+def _finish_inflight(key: Tuple[Any, ...], task: asyncio.Task) -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    if not task.cancelled():
+        task.exception()  # mark retrieved in case every caller was cancelled before it finished
+
+
+class _PollScheduler:
+    """Polls every in-flight Apify run from one background task.
+    
+    Each wave checks all pending runs concurrently, so N concurrent `get_google_places`
+    calls share one polling cadence instead of each running its own sleep loop. The wave
+    interval backs off exponentially (capped at 5s). Adding a run wakes the poller right away
+    and resets the interval, so a new run is not stuck behind an older run's backed-off sleep.
+    At most MAX_CONCURRENT_CHECKS status requests are in flight at once, so polling never
+    holds more than that many pooled connections regardless of how many runs are pending.
+    """
+    
+    TERMINAL_STATUSES = ("SUCCEEDED", "FAILED", "ABORTED", "TIMED-OUT")
+    MIN_INTERVAL = 0.1
+    MAX_INTERVAL = 5.0
+    MAX_WAIT = 120.0
+    MAX_CONCURRENT_CHECKS = 4
+    
+    def __init__(self) -> None:
+        self.pending: Dict[str, Tuple[asyncio.Future, float]] = {}
+        self._interval = self.MAX_INTERVAL
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+    
+    async def wait_for(self, run_id: str, poll_interval: float = 0.25) -> Dict[str, Any]:
+        """Wait until the Apify run reaches a terminal status and return its run data."""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self.pending[run_id] = (fut, loop.time() + self.MAX_WAIT)
+        self._interval = min(self._interval, max(poll_interval, self.MIN_INTERVAL))
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        elif self._wakeup is not None:
+            self._wakeup.set()
+        return await fut
+    
+    async def close(self) -> None:
+        """Stop the background poller, failing any runs still being waited on."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+    
+    async def _run(self) -> None:
+        limit = asyncio.Semaphore(self.MAX_CONCURRENT_CHECKS)
+        self._wakeup = asyncio.Event()
+        try:
+            while self.pending:
+                self._wakeup.clear()
+                run_ids = list(self.pending)
+                results = await asyncio.gather(
+                    *(self._check(run_id, limit) for run_id in run_ids), return_exceptions=True
+                )
+                now = asyncio.get_running_loop().time()
+                
+                for run_id, result in zip(run_ids, results):
+                    fut, deadline = self.pending[run_id]
+                    if fut.done():
+                        del self.pending[run_id]
+                    elif isinstance(result, BaseException):
+                        del self.pending[run_id]
+                        fut.set_exception(result)
+                    elif result["status"] in self.TERMINAL_STATUSES:
+                        del self.pending[run_id]
+                        fut.set_result(result)
+                    elif now > deadline:
+                        del self.pending[run_id]
+                        fut.set_exception(Exception("Apify run timed out."))
+                
+                if self.pending:
+                    # Sleep until the next wave, or until wait_for adds a run
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self._interval)
+                    except asyncio.TimeoutError:
+                        self._interval = min(self._interval * 2, self.MAX_INTERVAL)
+        except BaseException:
+            # Never leave callers awaiting a run that nobody is polling anymore
+            for fut, _ in self.pending.values():
+                if not fut.done():
+                    fut.set_exception(Exception("Apify run polling stopped."))
+            self.pending.clear()
+            raise
+    
+    async def _check(self, run_id: str, limit: asyncio.Semaphore) -> Dict[str, Any]:
+        async with limit:
+            res = await _get_client().get(f"https://api.apify.com/v2/actor-runs/{run_id}")
+        if res.status_code != 200:
+            raise Exception(f"Failed to check Apify run: {res.status_code} {res.text}")
+        
+        run = orjson.loads(res.content).get("data")
+        if not run or not run.get("status"):
+            raise Exception("Apify run status missing.")
+        return run
+
+
+_poll_scheduler = _PollScheduler()
+
+
+class _AsyncByteReader:
+    """Async file-like adapter so ijson can parse an httpx streaming response incrementally."""
+    
+    def __init__(self, response: httpx.Response) -> None:
+        self._chunks = response.aiter_bytes()
+    
+    async def read(self, size: int = -1) -> bytes:
+        if size == 0:  # ijson probes with read(0) to detect bytes vs str
+            return b""
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return b""
+
+
+@async_ttl_cache(900)
+@single_flight(lambda a: (a.get("topic"), a.get("language", "en")))
 async def get_latest_news(args: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Fetch the latest news headlines on a specific topic from NewsAPI.
     
@@ -41,11 +257,18 @@ async def get_latest_news(args: Dict[str, Any]) -> List[Dict[str, Any]]:
     topic = args.get("topic")
     language = args.get("language", "en")
     
-    url = f"https://newsapi.org/v2/everything?q={topic}&language={language}&pageSize=5&sortBy=publishedAt&apiKey={os.getenv('NEWS_API_KEY')}"
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        data = response.json()
+    client = _get_client()
+    response = await client.get(
+        "https://newsapi.org/v2/everything",
+        params={
+            "q": topic,
+            "language": language,
+            "pageSize": 5,
+            "sortBy": "publishedAt",
+            "apiKey": _NEWS_API_KEY,
+        },
+    )
+    data = orjson.loads(response.content)
     
     if not data.get("articles"):
         return {"error": "No articles found or invalid response."}
@@ -61,6 +284,25 @@ async def get_latest_news(args: Dict[str, Any]) -> List[Dict[str, Any]]:
     ]
 
 
+# Apify crawler input fields that are the same for every search
+_APIFY_INPUT_TEMPLATE: Dict[str, Any] = {
+    "includeWebResults": False,
+    "maxImages": 0,
+    "maximumLeadsEnrichmentRecords": 0,
+    "scrapeContacts": False,
+    "scrapeDirectories": False,
+    "scrapeImageAuthors": False,
+    "scrapePlaceDetailPage": False,
+    "scrapeReviewsPersonalData": True,
+    "scrapeTableReservationProvider": False,
+    "skipClosedPlaces": False,
+}
+
+
+@async_ttl_cache(1800, maxsize=32)
+@single_flight(lambda a: (
+    a.get("city"), a.get("query"), a.get("language", "en"), a.get("maxResults", 50), bool(a.get("includeRaw"))
+))
 async def get_google_places(args: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Find and retrieve information about places (restaurants, shops, services) in a specific location.
     
@@ -77,6 +319,8 @@ async def get_google_places(args: Dict[str, Any]) -> List[Dict[str, Any]]:
             - language (str, optional): Language code for results. Defaults to "en" (English).
             - maxResults (int, optional): Maximum number of results to return (1-200). Defaults to 50.
               Higher values may increase processing time.
+            - includeRaw (bool, optional): Include the complete raw Apify record for each place.
+              Defaults to False, since it roughly doubles the response size.
     
     Returns:
         List of dictionaries, each containing:
@@ -89,7 +333,7 @@ async def get_google_places(args: Dict[str, Any]) -> List[Dict[str, Any]]:
             - categories (str/list): Business categories or types
             - coordinates (dict): Geographic location with 'lat' and 'lng' keys
             - sourceUrl (str): Google Maps URL for the place
-            - raw (dict): Complete raw data from Google Places
+            - raw (dict): Complete raw data from Google Places (only when includeRaw is true)
     
     Example:
         >>> await get_google_places({"city": "Edmonton, Canada", "query": "pizza", "maxResults": 10})
@@ -103,113 +347,87 @@ async def get_google_places(args: Dict[str, Any]) -> List[Dict[str, Any]]:
         - The function uses the 'compass~crawler-google-places' Apify actor
         - Results are based on Google Maps data and may vary by location
         - Processing time depends on the number of results requested (typically 10-60 seconds)
+        - Run status is polled every 250ms at first, backing off to every 5 seconds
     """
     city = args.get("city")
     query = args.get("query")
     language = args.get("language", "en")
     max_results = args.get("maxResults", 50)
+    include_raw = bool(args.get("includeRaw", False))
     
-    token = os.getenv("APIFY_TOKEN")
+    token = _APIFY_TOKEN
     if not token:
         raise Exception("APIFY_TOKEN is not set in environment.")
     
     start_run_url = f"https://api.apify.com/v2/acts/compass~crawler-google-places/runs?token={token}"
     
     input_data = {
-        "includeWebResults": False,
+        **_APIFY_INPUT_TEMPLATE,
         "language": language,
         "locationQuery": city,
         "maxCrawledPlacesPerSearch": min(max(int(max_results), 1), 200),
-        "maxImages": 0,
-        "maximumLeadsEnrichmentRecords": 0,
-        "scrapeContacts": False,
-        "scrapeDirectories": False,
-        "scrapeImageAuthors": False,
-        "scrapePlaceDetailPage": False,
-        "scrapeReviewsPersonalData": True,
-        "scrapeTableReservationProvider": False,
         "searchStringsArray": [query],
-        "skipClosedPlaces": False,
     }
     
-    async with httpx.AsyncClient() as client:
-        # 1) Start run
-        start_res = await client.post(
-            start_run_url,
-            json=input_data,
-            headers={"Content-Type": "application/json"},
-        )
-        if start_res.status_code != 201:
-            raise Exception(f"Failed to start Apify run: {start_res.status_code} {start_res.text}")
-        
-        start_json = start_res.json()
-        run_id = start_json.get("data", {}).get("id")
-        if not run_id:
-            raise Exception("Apify run did not return a run ID.")
-        
-        # 2) Poll status
-        status_url = f"https://api.apify.com/v2/actor-runs/{run_id}"
-        max_wait_ms = 120000
-        poll_interval_ms = 2000
-        start_time = asyncio.get_event_loop().time()
-        
-        while True:
-            res = await client.get(status_url)
-            if res.status_code != 200:
-                raise Exception(f"Failed to check Apify run: {res.status_code} {res.text}")
-            
-            json_data = res.json()
-            run = json_data.get("data")
-            if not run or not run.get("status"):
-                raise Exception("Apify run status missing.")
-            
-            if run["status"] in ["SUCCEEDED", "FAILED", "ABORTED", "TIMED-OUT"]:
-                break
-            
-            elapsed = (asyncio.get_event_loop().time() - start_time) * 1000
-            if elapsed > max_wait_ms:
-                raise Exception("Apify run timed out.")
-            
-            await asyncio.sleep(poll_interval_ms / 1000)
-        
-        if run["status"] != "SUCCEEDED":
-            raise Exception(f"Apify run ended with status: {run['status']}")
-        
-        # 3) Fetch results
-        dataset_id = run.get("defaultDatasetId")
-        if not dataset_id:
-            raise Exception("No datasetId on Apify run result.")
-        
-        items_res = await client.get(
-            f"https://api.apify.com/v2/datasets/{dataset_id}/items?clean=true"
-        )
+    client = _get_client()
+    
+    # 1) Start run
+    start_res = await client.post(
+        start_run_url,
+        content=orjson.dumps(input_data),
+        headers={"Content-Type": "application/json"},
+    )
+    if start_res.status_code != 201:
+        raise Exception(f"Failed to start Apify run: {start_res.status_code} {start_res.text}")
+    
+    start_json = orjson.loads(start_res.content)
+    run_id = start_json.get("data", {}).get("id")
+    if not run_id:
+        raise Exception("Apify run did not return a run ID.")
+    
+    # 2) Wait for the run to finish (polled together with other in-flight runs)
+    run = await _poll_scheduler.wait_for(run_id)
+    
+    if run["status"] != "SUCCEEDED":
+        raise Exception(f"Apify run ended with status: {run['status']}")
+    
+    # 3) Fetch results
+    dataset_id = run.get("defaultDatasetId")
+    if not dataset_id:
+        raise Exception("No datasetId on Apify run result.")
+    
+    # Stream the dataset and map places as they are parsed instead of buffering the full JSON
+    mapped = []
+    async with client.stream(
+        "GET", f"https://api.apify.com/v2/datasets/{dataset_id}/items?clean=true"
+    ) as items_res:
         if items_res.status_code != 200:
+            await items_res.aread()
             raise Exception(f"Failed to fetch Apify dataset items: {items_res.status_code} {items_res.text}")
         
-        items = items_res.json()
-    
-    mapped = []
-    for p in (items if isinstance(items, list) else []):
-        mapped.append({
-            "name": p.get("title") or p.get("name"),
-            "rating": p.get("rating") or p.get("userRating"),
-            "reviewsCount": p.get("reviewsCount") or p.get("reviewCount"),
-            "address": p.get("address") or p.get("formattedAddress"),
-            "phone": p.get("phone") or p.get("phoneNumber"),
-            "website": p.get("website") or p.get("url"),
-            "categories": p.get("category") or p.get("types"),
-            "coordinates": p.get("location") or (
-                {"lat": p["coords"]["lat"], "lng": p["coords"]["lng"]}
-                if p.get("coords") else None
-            ),
-            "sourceUrl": p.get("googleMapsUrl") or p.get("url"),
-            "raw": p,
-        })
+        async for p in ijson.items(_AsyncByteReader(items_res), "item", use_float=True):
+            place = {
+                "name": p.get("title") or p.get("name"),
+                "rating": p.get("rating") or p.get("userRating"),
+                "reviewsCount": p.get("reviewsCount") or p.get("reviewCount"),
+                "address": p.get("address") or p.get("formattedAddress"),
+                "phone": p.get("phone") or p.get("phoneNumber"),
+                "website": p.get("website") or p.get("url"),
+                "categories": p.get("category") or p.get("types"),
+                "coordinates": p.get("location") or (
+                    {"lat": p["coords"]["lat"], "lng": p["coords"]["lng"]}
+                    if p.get("coords") else None
+                ),
+                "sourceUrl": p.get("googleMapsUrl") or p.get("url"),
+            }
+            if include_raw:
+                place["raw"] = p
+            mapped.append(place)
     
     return mapped
 
 
-async def convert_units(args: Dict[str, Any]) -> Dict[str, Any]:
+def convert_units(args: Dict[str, Any]) -> Dict[str, Any]:
     """Convert between common units of measurement for temperature and distance.
     
     This function performs unit conversions for temperature (Celsius/Fahrenheit) and distance (kilometers/miles).
@@ -232,21 +450,22 @@ async def convert_units(args: Dict[str, Any]) -> Dict[str, Any]:
         Returns error dict if invalid: {"error": "error message"}
     
     Examples:
-        >>> await convert_units({"kind": "c_to_f", "value": 25})
+        >>> convert_units({"kind": "c_to_f", "value": 25})
         {'input': 25, 'output': 77.0, 'unit': 'F'}
         
-        >>> await convert_units({"kind": "km_to_miles", "value": 100})
+        >>> convert_units({"kind": "km_to_miles", "value": 100})
         {'input': 100, 'output': 62.1371, 'unit': 'mi'}
         
-        >>> await convert_units({"kind": "f_to_c", "value": 32})
+        >>> convert_units({"kind": "f_to_c", "value": 32})
         {'input': 32, 'output': 0.0, 'unit': 'C'}
     
     Note:
         - Temperature conversions use standard formulas: F = C × 9/5 + 32 and C = (F - 32) × 5/9
         - Distance conversion uses: 1 km = 0.621371 miles
         - All calculations are performed locally without external API calls
+        - This is a plain (non-async) function; the tool dispatcher calls it without awaiting
     """
-    kind = args.get("kind", "").lower()
+    kind = args.get("kind", "")
     value = args.get("value")
     
     try:
@@ -254,16 +473,23 @@ async def convert_units(args: Dict[str, Any]) -> Dict[str, Any]:
     except (TypeError, ValueError):
         return {"error": "value must be a number"}
     
+    if kind not in ("c_to_f", "f_to_c", "km_to_miles"):
+        return {"error": f"unknown kind: {kind}"}
+    
+    return _convert(kind, v)
+
+
+@functools.lru_cache(maxsize=1024)
+def _convert(kind: str, v: float) -> Dict[str, Any]:
     if kind == "c_to_f":
         return {"input": v, "output": v * 9 / 5 + 32, "unit": "F"}
     elif kind == "f_to_c":
         return {"input": v, "output": (v - 32) * 5 / 9, "unit": "C"}
-    elif kind == "km_to_miles":
-        return {"input": v, "output": v * 0.621371, "unit": "mi"}
     else:
-        return {"error": f"unknown kind: {kind}"}
+        return {"input": v, "output": v * 0.621371, "unit": "mi"}
 
 
+@async_ttl_cache(1)
 async def get_time(args: Dict[str, Any]) -> Dict[str, str]:
     """Get the current server time in standardized ISO 8601 format.
     
@@ -290,5 +516,4 @@ async def get_time(args: Dict[str, Any]) -> Dict[str, str]:
         - The 'Z' suffix indicates UTC/Zulu time (equivalent to +00:00 offset)
         - This is server time, not necessarily the user's local time
     """
-    from datetime import datetime
-    return {"now": datetime.utcnow().isoformat() + "Z"}
+    return {"now": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")}
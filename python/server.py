@@ -1,7 +1,8 @@
 # server.py
 import os
-import json
-from datetime import datetime
+import asyncio
+import orjson
+from datetime import datetime, timezone
 from typing import Dict, Any, List
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
@@ -10,8 +11,8 @@ import openai
 from google import genai
 from google.genai import types
 
-from tools import register_tool, dispatch, list_tools_for_openai, list_tools_for_gemini
-from functions import get_latest_news, get_google_places, convert_units, get_time
+from tools import register_tool, freeze_registry, dispatch, list_tools_for_openai, list_tools_for_gemini
+from functions import get_latest_news, get_google_places, convert_units, get_time, close_client
 
 load_dotenv()
 
@@ -48,6 +49,7 @@ register_tool(
                 "query": {"type": "string", "description": "The type of place, business category, or specific search term. Be descriptive and specific. Examples: 'pizza restaurants', 'italian food', 'coffee shops', 'vegan restaurants', '5-star hotels', 'yoga studios', 'bookstores', 'sushi', 'breweries', 'fast food'. Use keywords that match what the user is looking for."},
                 "language": {"type": "string", "description": "Language code for the results and interface. Use ISO 639-1 codes: 'en' (English, default), 'es' (Spanish), 'fr' (French), 'de' (German), etc."},
                 "maxResults": {"type": "integer", "description": "Maximum number of places to return. Range: 1-200. Default is 50. Use lower numbers (5-20) for quick results or top recommendations. Use higher numbers (50-200) for comprehensive searches. Note: higher values increase processing time."},
+                "includeRaw": {"type": "boolean", "description": "Whether to include the complete raw Google Places record for each result under a 'raw' key. Defaults to false. Only set this to true when the user needs details beyond the standard fields (name, rating, reviews, address, phone, website, categories, coordinates, Google Maps link), since it roughly doubles the response size."},
             },
             "required": ["city", "query"],
             "additionalProperties": False,
@@ -82,10 +84,22 @@ register_tool(
     get_time,
 )
 
+freeze_registry()
+
+# -----------------------
+# Provider tool configs (tool specs are static once registered)
+# -----------------------
+OPENAI_TOOLS = list_tools_for_openai()
+
+GEMINI_CONFIG = types.GenerateContentConfig(
+    tools=[types.Tool(function_declarations=list_tools_for_gemini())],
+    system_instruction="You are a helpful assistant. When you use tools to fetch information, always present the results with full details including titles, sources, URLs, and dates. Be comprehensive and include all relevant information from the tool results. When a question has multiple parts, use all available tools to answer each part thoroughly.",
+)
+
 # -----------------------
 # Clients
 # -----------------------
-openai.api_key = os.getenv("OPENAI_API_KEY")
+openai_client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 gemini_client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 
 # -----------------------
@@ -95,13 +109,20 @@ MODEL_PRICING = {"input": 0.005, "output": 0.015}  # example pricing
 
 
 def log(message: str, data: Any = None):
-    timestamp = datetime.utcnow().isoformat() + "Z"
+    timestamp = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
     if data:
         print(f"[{timestamp}] {message}", data)
     else:
         print(f"[{timestamp}] {message}")
 
 
+async def run_tool(name: str, args: Dict[str, Any]) -> Any:
+    try:
+        return await dispatch(name, args)
+    except Exception as err:
+        return {"error": str(err)}
+
+
 def cost_from_usage(usage: Dict[str, int]) -> float:
     if not usage:
         return 0.0
@@ -110,6 +131,12 @@ def cost_from_usage(usage: Dict[str, int]) -> float:
     return in_cost + out_cost
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    await close_client()
+    await openai_client.close()
+
+
 # -----------------------
 # Request Models
 # -----------------------
@@ -132,11 +159,10 @@ async def query_openai(request: QueryRequest):
     
     try:
         # Step 1: Ask OpenAI with tools
-        client = openai.OpenAI(api_key=openai.api_key)
-        first = client.chat.completions.create(
+        first = await openai_client.chat.completions.create(
             model="gpt-4o",
             messages=[{"role": "user", "content": query}],
-            tools=list_tools_for_openai(),
+            tools=OPENAI_TOOLS,
             tool_choice="auto",
         )
         
@@ -159,29 +185,38 @@ async def query_openai(request: QueryRequest):
                 "estimated_cost_usd": round(total_cost, 6),
             }
         
-        # Step 2: Execute tool calls
-        tool_responses = []
+        # Step 2: Execute tool calls concurrently
+        parsed_calls = []
         for call in calls:
             name = call.function.name
             args_string = call.function.arguments
-            args = json.loads(args_string) if args_string else {}
+            args = orjson.loads(args_string) if args_string else {}
             log(f"⚙️ {name}", args)
-            
-            result = await dispatch(name, args)
-            tool_responses.append({
+            parsed_calls.append((call, name, args))
+        
+        async def run_call(index: int, name: str, args: Dict[str, Any]):
+            return index, await run_tool(name, args)
+        
+        # Serialize each tool result as soon as it lands instead of waiting on the slowest tool
+        tool_responses: List[Dict[str, Any]] = [None] * len(parsed_calls)
+        pending = [run_call(i, name, args) for i, (_, name, args) in enumerate(parsed_calls)]
+        for next_done in asyncio.as_completed(pending):
+            index, result = await next_done
+            call, name, _ = parsed_calls[index]
+            tool_responses[index] = {
                 "role": "tool",
                 "tool_call_id": call.id,
-                "content": json.dumps(result),
+                "content": orjson.dumps(result).decode(),
                 "name": name,
-            })
+            }
         
         # Step 3: Ask OpenAI to summarize
         messages = [
             {"role": "user", "content": query},
-            assistant_msg.model_dump(),
+            assistant_msg.model_dump(exclude_none=True, exclude_unset=True),
         ] + tool_responses
         
-        final = client.chat.completions.create(
+        final = await openai_client.chat.completions.create(
             model="gpt-4o-mini",
             messages=messages,
         )
@@ -218,19 +253,11 @@ async def query_gemini(request: QueryRequest):
     log("📩 /query-gemini", {"query": query})
     
     try:
-        # Step 1: Create tools config
-        gemini_tools = list_tools_for_gemini()
-        tools = types.Tool(function_declarations=gemini_tools)
-        config = types.GenerateContentConfig(
-            tools=[tools],
-            system_instruction="You are a helpful assistant. When you use tools to fetch information, always present the results with full details including titles, sources, URLs, and dates. Be comprehensive and include all relevant information from the tool results. When a question has multiple parts, use all available tools to answer each part thoroughly.",
-        )
-        
-        # First turn with tools
-        first = gemini_client.models.generate_content(
+        # Step 1: First turn with tools
+        first = await gemini_client.aio.models.generate_content(
             model="gemini-2.5-flash",
             contents=query,
-            config=config,
+            config=GEMINI_CONFIG,
         )
         
         # Extract ALL function calls from the response (parallel function calling)
@@ -249,12 +276,14 @@ async def query_gemini(request: QueryRequest):
             return {"response": text}
         
         # Step 2: Execute ALL function calls (parallel execution)
-        function_responses = []
         for fc in function_calls:
+            log(f"⚙️ Gemini tool call: {fc['name']}", fc["args"])
+        
+        raw_results = await asyncio.gather(*(run_tool(fc["name"], fc["args"]) for fc in function_calls))
+        
+        function_responses = []
+        for fc, result in zip(function_calls, raw_results):
             name = fc["name"]
-            args = fc["args"]
-            log(f"⚙️ Gemini tool call: {name}", args)
-            result = await dispatch(name, args)
             
             # Ensure result is a dictionary for Gemini API
             if isinstance(result, list):
@@ -267,14 +296,14 @@ async def query_gemini(request: QueryRequest):
             )
         
         # Step 3: Send all function responses back
-        second = gemini_client.models.generate_content(
+        second = await gemini_client.aio.models.generate_content(
             model="gemini-2.5-flash",
             contents=[
                 types.Content(role="user", parts=[types.Part(text=query)]),
                 first.candidates[0].content,
                 types.Content(role="model", parts=function_responses),
             ],
-            config=config,
+            config=GEMINI_CONFIG,
         )
         
         final_text = second.text if hasattr(second, 'text') else ""
@@ -293,4 +322,4 @@ if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
     log(f"🚀 Server running at http://localhost:{port}")
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    uvicorn.run(app, host="0.0.0.0", port=port, loop="uvloop", http="httptools")
@@ -1,9 +1,53 @@
 # tools.py
 # A tool registry + helpers to expose specs in the shape each provider expects.
 
-from typing import Dict, Any, Callable, List
+import sys
+import copy
+import inspect
+import functools
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Any, Callable, Mapping, Tuple
 
-TOOL_REGISTRY: Dict[str, Dict[str, Any]] = {}
+import fastjsonschema
+import orjson
+
+
+@dataclass(slots=True)
+class ToolEntry:
+    """A registered tool: its spec, handler, compiled argument validator, and provider payloads."""
+    
+    name: str
+    description: str
+    parameters: Dict[str, Any]
+    parameters_gemini: Dict[str, Any]
+    handler: Callable
+    is_async: bool
+    validator: Callable[[Any], Any]
+    openai_payload: Mapping[str, Any]
+    gemini_payload: Mapping[str, Any]
+    openai_json: bytes
+    gemini_json: bytes
+
+
+TOOL_REGISTRY: Dict[str, ToolEntry] = {}
+
+# Provider-formatted payloads for every registered tool, rebuilt on each register_tool call
+_OPENAI_LIST: Tuple[Mapping[str, Any], ...] = ()
+_GEMINI_LIST: Tuple[Mapping[str, Any], ...] = ()
+_OPENAI_TOOLS_JSON: bytes = b"[]"
+_GEMINI_TOOLS_JSON: bytes = b"[]"
+
+# Read-only snapshot of the registry taken by freeze_registry(); empty until frozen
+_FROZEN_KEYS: Tuple[str, ...] = ()
+_FROZEN_ENTRIES: Tuple[ToolEntry, ...] = ()
+
+
+def _strip_additional_properties(params: Dict[str, Any]) -> Dict[str, Any]:
+    # Gemini rejects additionalProperties; only allocate a stripped copy when it is present
+    if "additionalProperties" not in params:
+        return params
+    return {k: v for k, v in params.items() if k != "additionalProperties"}
 
 
 def register_tool(spec: Dict[str, Any], handler: Callable) -> None:
@@ -21,11 +65,13 @@ def register_tool(spec: Dict[str, Any], handler: Callable) -> None:
               Be specific as LLMs use this to decide which tool to call.
             - parameters (dict, required): JSON Schema object defining the tool's input parameters.
               Must include 'type', 'properties', and optionally 'required' array.
-        handler: Async callable function that executes the tool's logic. Should accept a dictionary
-            of arguments and return the result (typically a dict or list).
+        handler: Callable (sync or async) that executes the tool's logic. Should accept a dictionary
+            of arguments and return the result (typically a dict or list). Pure, CPU-only tools
+            can be plain functions to skip coroutine overhead.
     
     Raises:
-        ValueError: If the spec is missing a 'name' field.
+        ValueError: If the spec is missing a 'name' field, or its 'parameters' schema is not a dict
+            or cannot be compiled into a validator.
     
     Example:
         >>> def my_handler(args):
@@ -50,25 +96,88 @@ def register_tool(spec: Dict[str, Any], handler: Callable) -> None:
         - Tools are stored globally and persist for the application lifetime
         - Each tool name must be unique; registering a duplicate name will overwrite the previous one
         - Both OpenAI and Gemini can use registered tools automatically
+        - The parameters schema is compiled into an argument validator once, here. Compilation
+          catches structural errors (unknown types, malformed keywords), but it is not a full
+          meta-schema check: some invalid keyword values are silently ignored
     """
+    global _OPENAI_LIST, _GEMINI_LIST, _OPENAI_TOOLS_JSON, _GEMINI_TOOLS_JSON
+    global _FROZEN_KEYS, _FROZEN_ENTRIES
     name = spec.get("name")
     if not name:
         raise ValueError("Tool must have a name")
+    # Intern registered names only; names from the model are untrusted and interned strings are
+    # never freed, so dispatch compares them by value
+    name = sys.intern(name)
+    
+    params = spec.get("parameters") or {}
+    if not isinstance(params, dict):
+        raise ValueError(f"Invalid parameters schema for {name}: expected a dict")
+    # Own a copy so later edits to the caller's spec cannot change what is validated or served
+    params = copy.deepcopy(params)
+    # Compiling rejects malformed schemas now instead of on some later request
+    try:
+        validator = fastjsonschema.compile(params)
+    except Exception as err:
+        raise ValueError(f"Invalid parameters schema for {name}: {err}") from err
+    
+    params_gemini = _strip_additional_properties(params)
+    description = spec.get("description") or ""
+    
+    openai_function = {"name": name, "description": description, "parameters": params}
+    gemini_payload = {"name": name, "description": description, "parameters": params_gemini}
+    
+    TOOL_REGISTRY[name] = ToolEntry(
+        name=name,
+        description=description,
+        parameters=params,
+        parameters_gemini=params_gemini,
+        handler=handler,
+        is_async=inspect.iscoroutinefunction(handler),
+        validator=validator,
+        # Read-only views, since the same payloads are handed to every caller
+        openai_payload=MappingProxyType({"type": "function", "function": MappingProxyType(openai_function)}),
+        gemini_payload=MappingProxyType(gemini_payload),
+        openai_json=orjson.dumps({"type": "function", "function": openai_function}),
+        gemini_json=orjson.dumps(gemini_payload),
+    )
+    _OPENAI_LIST = tuple(t.openai_payload for t in TOOL_REGISTRY.values())
+    _GEMINI_LIST = tuple(t.gemini_payload for t in TOOL_REGISTRY.values())
+    _OPENAI_TOOLS_JSON = b"[" + b",".join(t.openai_json for t in TOOL_REGISTRY.values()) + b"]"
+    _GEMINI_TOOLS_JSON = b"[" + b",".join(t.gemini_json for t in TOOL_REGISTRY.values()) + b"]"
+    # Registering after a freeze drops the snapshot until freeze_registry() is called again
+    _FROZEN_KEYS = ()
+    _FROZEN_ENTRIES = ()
+
+
+def freeze_registry() -> None:
+    """Snapshot the registry into name/entry tuples for faster dispatch.
+    
+    Call this once all tools are registered (typically at server startup). While frozen,
+    dispatch finds the requested tool with a short linear scan over the snapshot instead of a
+    generic dict lookup, which is cheap for the handful of tools a server exposes.
     
-    TOOL_REGISTRY[name] = {
-        "name": name,
-        "description": spec.get("description", ""),
-        "parameters": spec.get("parameters", {}),
-        "handler": handler,
-    }
+    Note:
+        - Any later register_tool call discards the snapshot and dispatch falls back to
+          TOOL_REGISTRY until freeze_registry() is called again
+    """
+    global _FROZEN_KEYS, _FROZEN_ENTRIES
+    _FROZEN_KEYS = tuple(TOOL_REGISTRY)  # names are interned by register_tool
+    _FROZEN_ENTRIES = tuple(TOOL_REGISTRY.values())
+
+
+@functools.lru_cache(maxsize=256)
+def _unknown_tool_error(tool_name: str) -> Dict[str, str]:
+    # Shared between calls for the same bad name; callers only serialize it, never mutate it
+    return {"error": f"Unknown tool: {tool_name}"}
 
 
 async def dispatch(tool_name: str, args: Dict[str, Any]) -> Any:
     """Execute a registered tool by name with the provided arguments.
     
-    This function looks up a tool in the registry and invokes its handler with the given arguments.
-    It provides error handling to catch and return any exceptions that occur during tool execution.
-    This is the central dispatcher used when LLMs request function calls.
+    This function looks up a tool in the registry, validates the arguments against the tool's
+    parameter schema, and invokes its handler. Unknown tools and invalid arguments are reported
+    as error results; exceptions raised by the handler propagate to the caller. This is the
+    central dispatcher used when LLMs request function calls.
     
     Args:
         tool_name: The unique name of the tool to execute (must match a registered tool name)
@@ -77,7 +186,12 @@ async def dispatch(tool_name: str, args: Dict[str, Any]) -> Any:
     
     Returns:
         The result returned by the tool's handler function (typically a dict or list).
-        Returns {"error": "error message"} if the tool is not found or execution fails.
+        Returns {"error": "error message"} if the tool is not found.
+        Returns {"error": "invalid arguments", "detail": "..."} if args don't match the schema.
+    
+    Raises:
+        Exception: Whatever the tool's handler raises. The server translates these into
+            {"error": "error message"} results before sending them back to the LLM.
     
     Example:
         >>> await dispatch("get_time", {})
@@ -88,25 +202,38 @@ async def dispatch(tool_name: str, args: Dict[str, Any]) -> Any:
         
         >>> await dispatch("nonexistent_tool", {})
         {'error': 'Unknown tool: nonexistent_tool'}
+        
+        >>> await dispatch("convert_units", {"kind": "c_to_f"})
+        {'error': 'invalid arguments', 'detail': "data must contain ['value'] properties"}
     
     Note:
         - This is an async function and must be awaited
-        - All tool handlers are called as async functions
-        - Errors are caught and returned as error dictionaries rather than raising exceptions
+        - Async handlers are awaited; sync handlers are called directly without creating a coroutine
+        - Arguments are checked with the validator compiled at registration, so malformed calls
+          are rejected before any handler code (or network I/O) runs
+        - Handler errors are not caught here; only schema violations are turned into results
         - Used internally by the server when processing LLM function call requests
     """
-    spec = TOOL_REGISTRY.get(tool_name)
-    if not spec:
-        return {"error": f"Unknown tool: {tool_name}"}
+    for key, entry in zip(_FROZEN_KEYS, _FROZEN_ENTRIES):
+        if key == tool_name:
+            break
+    else:
+        # Not frozen (or not found in the snapshot): fall back to the registry dict
+        entry = TOOL_REGISTRY.get(tool_name)
+        if entry is None:
+            return _unknown_tool_error(tool_name)
     
     try:
-        handler = spec["handler"]
-        return await handler(args)
-    except Exception as err:
-        return {"error": str(err)}
+        entry.validator(args)
+    except fastjsonschema.JsonSchemaValueException as err:
+        return {"error": "invalid arguments", "detail": err.message}
+    
+    if entry.is_async:
+        return await entry.handler(args)
+    return entry.handler(args)
 
 
-def list_tools_for_openai() -> List[Dict[str, Any]]:
+def list_tools_for_openai() -> Tuple[Mapping[str, Any], ...]:
     """Format all registered tools for OpenAI's Chat Completions API function calling.
     
     This function converts the tool registry into the specific format required by OpenAI's
@@ -114,8 +241,8 @@ def list_tools_for_openai() -> List[Dict[str, Any]]:
     and includes the complete JSON Schema for parameters.
     
     Returns:
-        List of dictionaries in OpenAI's required format:
-        [
+        Tuple of read-only mappings in OpenAI's required format:
+        (
             {
                 "type": "function",
                 "function": {
@@ -125,7 +252,7 @@ def list_tools_for_openai() -> List[Dict[str, Any]]:
                 }
             },
             ...
-        ]
+        )
     
     Example:
         >>> tools = list_tools_for_openai()
@@ -141,38 +268,31 @@ def list_tools_for_openai() -> List[Dict[str, Any]]:
         - Format follows OpenAI's function calling specification
         - Includes 'additionalProperties' field which OpenAI accepts
         - Used by the /query endpoint for OpenAI function calling
+        - Payloads are prebuilt at registration and shared between calls. The tuple and the two
+          top-level mappings are read-only, but the nested "parameters" schema is a plain dict
+          (the SDK JSON-encodes it directly) shared with the registry, so callers must not mutate it
     """
-    return [
-        {
-            "type": "function",
-            "function": {
-                "name": t["name"],
-                "description": t["description"],
-                "parameters": t["parameters"],
-            },
-        }
-        for t in TOOL_REGISTRY.values()
-    ]
+    return _OPENAI_LIST
 
 
-def list_tools_for_gemini() -> List[Dict[str, Any]]:
+def list_tools_for_gemini() -> Tuple[Mapping[str, Any], ...]:
     """Format all registered tools for Google Gemini's function calling API.
     
     This function converts the tool registry into the specific format required by Gemini's
-    function calling feature. It returns a flat list of function declarations and automatically
+    function calling feature. It returns a flat tuple of function declarations and automatically
     removes the 'additionalProperties' field from JSON Schema parameters, as Gemini's API
     validation rejects this field.
     
     Returns:
-        List of function declaration dictionaries in Gemini's required format:
-        [
+        Tuple of read-only function declaration mappings in Gemini's required format:
+        (
             {
                 "name": "tool_name",
                 "description": "tool description",
                 "parameters": {...}  # JSON Schema without 'additionalProperties'
             },
             ...
-        ]
+        )
     
     Example:
         >>> function_declarations = list_tools_for_gemini()
@@ -186,21 +306,33 @@ def list_tools_for_gemini() -> List[Dict[str, Any]]:
     
     Note:
         - Returns all tools currently registered in TOOL_REGISTRY
-        - Automatically strips 'additionalProperties' from parameter schemas for Gemini compatibility
+        - Parameter schemas have 'additionalProperties' stripped at registration for Gemini compatibility
         - Format follows Google's function calling specification for the new google-genai library
         - Used by the /query-gemini endpoint for Gemini function calling
         - The caller must wrap this in types.Tool(function_declarations=...)
+        - Payloads are prebuilt at registration and shared between calls. The tuple and each
+          declaration mapping are read-only, but the nested "parameters" schema is a plain dict
+          shared with the registry, so callers must not mutate it
     """
-    tools = []
-    for t in TOOL_REGISTRY.values():
-        # Remove additionalProperties from parameters as Gemini doesn't accept it
-        params = t["parameters"].copy()
-        if "additionalProperties" in params:
-            params = {k: v for k, v in params.items() if k != "additionalProperties"}
-        
-        tools.append({
-            "name": t["name"],
-            "description": t["description"],
-            "parameters": params,
-        })
-    return tools
+    return _GEMINI_LIST
+
+
+def list_tools_for_openai_bytes() -> bytes:
+    """Return the OpenAI tool list as prebuilt JSON bytes.
+    
+    Same content as list_tools_for_openai(), serialized once at registration. Use this when
+    assembling a raw HTTP request body so the tool schemas are not re-encoded on every request.
+    
+    Example:
+        >>> body = b'{"model":"gpt-4o","tools":' + list_tools_for_openai_bytes() + b',"messages":[...]}'
+    """
+    return _OPENAI_TOOLS_JSON
+
+
+def list_tools_for_gemini_bytes() -> bytes:
+    """Return the Gemini function declarations as prebuilt JSON bytes.
+    
+    Same content as list_tools_for_gemini(), serialized once at registration. Use this when
+    assembling a raw HTTP request body so the tool schemas are not re-encoded on every request.
+    """
+    return _GEMINI_TOOLS_JSON